@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Fetch openly licensed 2D/3D game assets into a per-license corpus.
+
+Scans a streamed Hugging Face dataset of OpenGameArt-style asset
+records, classifies each one as 2D or 3D art, and downloads it under
+``assets/<license>/<type>/`` with a JSON metadata sidecar, so corpus
+builds downstream can respect license boundaries.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+import urllib.request
+from pathlib import Path
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+
+    def _dumps_line(obj):
+        return orjson.dumps(obj) + b"\n"
+except ImportError:
+    def _dumps_line(obj):
+        return json.dumps(obj).encode() + b"\n"
+
+# save_metadata flushes the JSONL handles after this many lines.
+_META_FLUSH_EVERY = 64
+
+# Licenses we accept, mapped to their directory names.
+LICENSES = {
+    "cc0": "cc0",
+    "cc-by 3.0": "cc_by",
+    "cc-by 4.0": "cc_by",
+    "cc-by-sa 3.0": "cc_by_sa",
+    "cc-by-sa 4.0": "cc_by_sa",
+    "gpl 2.0": "gpl",
+    "gpl 3.0": "gpl",
+    "oga-by 3.0": "oga_by",
+}
+
+KEYWORDS_2D = [
+    "sprite", "pixel art", "tileset", "tilemap", "texture", "icon",
+    "2d character", "top-down", "side-scroller", "concept art",
+    "ui element", "portrait",
+]
+
+KEYWORDS_3D = [
+    "3d model", "low poly", "low-poly", "mesh", "rigged", "blender",
+    "voxel", "3d character", "3d environment", "pbr material",
+]
+
+EXTENSIONS_2D = (".png", ".gif", ".jpg", ".jpeg", ".webp", ".bmp", ".svg")
+EXTENSIONS_3D = (".blend", ".fbx", ".obj", ".gltf", ".glb", ".dae", ".stl")
+
+
+def _build_automaton(keywords):
+    auto = ahocorasick.Automaton()
+    for keyword in keywords:
+        auto.add_word(keyword, keyword)
+    auto.make_automaton()
+    return auto
+
+
+class AssetFetcher:
+    """Downloads license-sorted 2D and 3D assets from remote datasets."""
+
+    def __init__(self, output_dir="assets", per_file_metadata=False):
+        self.output_dir = Path(output_dir)
+        self.stats = {"downloaded": 0, "skipped": 0, "failed": 0}
+        self.per_file_metadata = per_file_metadata
+        # One appended JSONL per (license, type), handle held open for
+        # the whole run instead of an open/write/close per asset.
+        self._meta_fp = {}
+        self._meta_pending = 0
+        self._setup_directories()
+
+        # One automaton per keyword set, built once at init:
+        # classification is then a single pass over the text no matter
+        # how many keywords are registered, instead of one substring
+        # scan per keyword per streamed record.
+        if ahocorasick is not None:
+            self._auto_2d = _build_automaton(KEYWORDS_2D)
+            self._auto_3d = _build_automaton(KEYWORDS_3D)
+        else:
+            self._auto_2d = None
+            self._auto_3d = None
+
+    @staticmethod
+    def _count_entries(path):
+        # scandir yields lightweight DirEntry objects straight from the
+        # dirents; glob("*") would build a Path per existing file just
+        # to throw it away after len().
+        return sum(1 for _ in os.scandir(path))
+
+    def _setup_directories(self):
+        for license_dir in sorted(set(LICENSES.values())):
+            for kind in ("2d", "3d"):
+                (self.output_dir / license_dir / kind).mkdir(
+                    parents=True, exist_ok=True)
+            meta_dir = self.output_dir / license_dir / "metadata"
+            meta_dir.mkdir(parents=True, exist_ok=True)
+            existing = (
+                self._count_entries(self.output_dir / license_dir / "2d")
+                + self._count_entries(self.output_dir / license_dir / "3d"))
+            existing_meta = self._count_entries(meta_dir)
+            if existing:
+                print(f"  {license_dir}: {existing} assets, "
+                      f"{existing_meta} metadata files")
+
+    @staticmethod
+    def _haystack(item):
+        """Searchable lowercased text for one record.
+
+        Fields are joined on a unit separator so a keyword can never
+        match across a field boundary.
+        """
+        tags = item.get("tags") or []
+        return "\x1f".join([
+            str(item.get("title", "")).lower(),
+            str(item.get("description", "")).lower(),
+            "\x1f".join(str(tag).lower() for tag in tags),
+        ])
+
+    def _matches(self, auto, keywords, item):
+        haystack = self._haystack(item)
+        if auto is not None:
+            return next(auto.iter(haystack), None) is not None
+        return any(keyword in haystack for keyword in keywords)
+
+    def is_2d_asset(self, item):
+        """Does this record look like 2D art (by extension or text)?"""
+        if item.get("url", "").lower().endswith(EXTENSIONS_2D):
+            return True
+        return self._matches(self._auto_2d, KEYWORDS_2D, item)
+
+    def is_3d_asset(self, item):
+        """Does this record look like a 3D model (by extension or text)?"""
+        if item.get("url", "").lower().endswith(EXTENSIONS_3D):
+            return True
+        return self._matches(self._auto_3d, KEYWORDS_3D, item)
+
+    @staticmethod
+    def _check_length(dest_path, written, declared):
+        """Drop and reject a download shorter than its Content-Length."""
+        if declared and written != int(declared):
+            dest_path.unlink(missing_ok=True)
+            raise OSError(f"truncated download: {written} of "
+                          f"{declared} bytes for {dest_path.name}")
+
+    def download_file(self, url, dest_path, timeout=30):
+        request = urllib.request.Request(
+            url, headers={"User-Agent": "sprite-sheet-corpus/1.0"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            # Stream in 1 MiB chunks so a multi-MB .blend never sits
+            # whole in memory between read and write.
+            with open(dest_path, "wb") as out_file:
+                shutil.copyfileobj(response, out_file, length=1 << 20)
+                written = out_file.tell()
+            self._check_length(dest_path, written,
+                               response.headers.get("Content-Length"))
+        return dest_path
+
+    def save_metadata(self, asset_id, item, license_dir, kind):
+        metadata = {
+            "id": asset_id,
+            "url": item.get("url", ""),
+            "title": item.get("title", ""),
+            "license": item.get("license", ""),
+            "type": kind,
+            "tags": item.get("tags", []),
+        }
+        if self.per_file_metadata:
+            # Back-compat layout: one pretty-printed JSON per asset.
+            path = (self.output_dir / license_dir / "metadata"
+                    / f"{asset_id}.json")
+            with open(path, "w") as f:
+                json.dump(metadata, f, indent=2)
+            return
+        key = (license_dir, kind)
+        fp = self._meta_fp.get(key)
+        if fp is None:
+            fp = open(self.output_dir / license_dir / "metadata"
+                      / f"index_{kind}.jsonl", "ab")
+            self._meta_fp[key] = fp
+        fp.write(_dumps_line(metadata))
+        self._meta_pending += 1
+        if self._meta_pending >= _META_FLUSH_EVERY:
+            for handle in self._meta_fp.values():
+                handle.flush()
+            self._meta_pending = 0
+
+    def close_metadata(self):
+        for fp in self._meta_fp.values():
+            fp.close()
+        self._meta_fp.clear()
+        self._meta_pending = 0
+
+    async def _download_async(self, session, semaphore, url, dest_path):
+        async with semaphore:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                with open(dest_path, "wb") as out_file:
+                    async for chunk in response.content.iter_chunked(1 << 20):
+                        out_file.write(chunk)
+                    written = out_file.tell()
+                self._check_length(dest_path, written,
+                                   response.headers.get("Content-Length"))
+
+    async def _fetch_one_async(self, session, semaphore, item,
+                               license_dir, kind, name):
+        dest_path = self.output_dir / license_dir / kind / name
+        await self._download_async(session, semaphore,
+                                   item.get("url", ""), dest_path)
+        self.save_metadata(Path(name).stem, item, license_dir, kind)
+        return f"{license_dir}/{kind}/{name}"
+
+    async def _fetch_async(self, accepted):
+        # Overlapping connections hide the per-request RTT; the
+        # semaphore plus the per-host connection cap do the politeness
+        # work the serial sleep used to.
+        semaphore = asyncio.Semaphore(8)
+        connector = aiohttp.TCPConnector(limit_per_host=4)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = [
+                asyncio.ensure_future(
+                    self._fetch_one_async(session, semaphore, *record))
+                for record in accepted
+            ]
+            for task in asyncio.as_completed(tasks):
+                try:
+                    label = await task
+                except Exception as exc:
+                    self.stats["failed"] += 1
+                    print(f"  failed: {exc}")
+                    continue
+                self.stats["downloaded"] += 1
+                print(f"  [{self.stats['downloaded']}] {label}")
+
+    def _accept(self, item):
+        """License/type gate for one streamed record.
+
+        Returns ``(item, license_dir, kind, name)`` for an asset worth
+        downloading, or None (counted as skipped).
+        """
+        license_dir = LICENSES.get(str(item.get("license", "")).lower())
+        if license_dir is None:
+            self.stats["skipped"] += 1
+            return None
+        if self.is_2d_asset(item):
+            kind = "2d"
+        elif self.is_3d_asset(item):
+            kind = "3d"
+        else:
+            self.stats["skipped"] += 1
+            return None
+        name = item.get("url", "").rsplit("/", 1)[-1]
+        if not name or (self.output_dir / license_dir / kind / name).exists():
+            self.stats["skipped"] += 1
+            return None
+        return item, license_dir, kind, name
+
+    def fetch_dataset(self, dataset_name, target_count=1000):
+        """Stream a HF dataset and download accepted assets in parallel."""
+        from datasets import load_dataset
+
+        dataset = load_dataset(dataset_name, split="train", streaming=True)
+        accepted = []
+        for item in dataset:
+            if len(accepted) >= target_count:
+                break
+            record = self._accept(item)
+            if record is not None:
+                accepted.append(record)
+
+        if aiohttp is not None:
+            asyncio.run(self._fetch_async(accepted))
+        else:
+            # Serial fallback without aiohttp, paced by a politeness
+            # pause between requests to the asset host.
+            for item, license_dir, kind, name in accepted:
+                dest_path = self.output_dir / license_dir / kind / name
+                try:
+                    self.download_file(item.get("url", ""), dest_path)
+                except OSError as exc:
+                    self.stats["failed"] += 1
+                    print(f"  failed {item.get('url', '')}: {exc}")
+                    continue
+                self.save_metadata(Path(name).stem, item, license_dir, kind)
+                self.stats["downloaded"] += 1
+                print(f"  [{self.stats['downloaded']}] "
+                      f"{license_dir}/{kind}/{name}")
+                time.sleep(0.3)
+
+        self.close_metadata()
+        print(f"Downloaded {self.stats['downloaded']} assets "
+              f"({self.stats['skipped']} skipped, "
+              f"{self.stats['failed']} failed) to {self.output_dir}/")
+        return self.stats["downloaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch license-sorted game assets")
+    parser.add_argument("--dataset", default="opengameart/assets",
+                        help="Hugging Face dataset to scan")
+    parser.add_argument("--count", type=int, default=1000,
+                        help="target number of assets")
+    parser.add_argument("--output", default="assets",
+                        help="output directory")
+    parser.add_argument("--per-file-metadata", action="store_true",
+                        help="write one JSON sidecar per asset instead "
+                             "of the per-license JSONL index")
+    args = parser.parse_args()
+
+    fetcher = AssetFetcher(output_dir=args.output,
+                           per_file_metadata=args.per_file_metadata)
+    fetcher.fetch_dataset(args.dataset, target_count=args.count)
+
+
+if __name__ == "__main__":
+    main()
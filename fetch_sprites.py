@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Fetch sprite sheets from a Hugging Face dataset for the tester.
+
+Downloads candidate sprite-sheet images plus a small JSON metadata
+sidecar per sprite into ``sprites/``, so they can be loaded into the
+HTML tester or fed to the analysis tools.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson
+
+    def _dumps_line(obj):
+        return orjson.dumps(obj) + b"\n"
+except ImportError:
+    def _dumps_line(obj):
+        return json.dumps(obj).encode() + b"\n"
+
+try:
+    import zstandard
+
+    CORPUS_NAME = "metadata.jsonl.zst"
+
+    def _open_corpus(path, mode):
+        return zstandard.open(path, mode)
+except ImportError:
+    CORPUS_NAME = "metadata.jsonl"
+
+    def _open_corpus(path, mode):
+        return open(path, mode)
+
+try:
+    from blake3 import blake3 as _hash_fn
+
+    def _short_hash(data):
+        return _hash_fn(data).hexdigest(length=8)
+except ImportError:
+    _b2b = hashlib.blake2b
+
+    def _short_hash(data):
+        return _b2b(data, digest_size=8).hexdigest()
+
+# Keywords that mark an asset as a likely sprite sheet.
+SPRITE_KEYWORDS = [
+    "sprite sheet", "spritesheet", "sprite-sheet", "sprite strip",
+    "animation frames", "walk cycle", "run cycle", "character sheet",
+    "tileset", "pixel art character", "animated sprite",
+]
+
+# Assets we never want, even if they match above.
+EXCLUDE_KEYWORDS = [
+    "3d model", "3d render", "photograph", "photo of", "wallpaper",
+    "screenshot", "logo",
+]
+
+# Frozen copies for O(1) whole-tag membership on the fast path.
+SPRITE_KW_SET = frozenset(SPRITE_KEYWORDS)
+EXCLUDE_KW_SET = frozenset(EXCLUDE_KEYWORDS)
+
+IMAGE_EXTENSIONS = (".png", ".gif", ".jpg", ".jpeg", ".webp", ".bmp")
+
+
+def get_file_extension(name):
+    """Lowercased extension of a file name/url, defaulting to .png.
+
+    str.rfind instead of Path(name).suffix: this runs once per dataset
+    entry and Path construction is the expensive part at that rate.
+    """
+    i = name.rfind(".")
+    return name[i:].lower() if i >= 0 else ".png"
+
+
+try:
+    import ahocorasick
+
+    # Single-pass scan over all keywords at once, instead of one
+    # substring search per keyword per item.
+    _AUTOMATON = ahocorasick.Automaton()
+    for _group, _keywords in (("sprite", SPRITE_KEYWORDS),
+                              ("excl", EXCLUDE_KEYWORDS)):
+        for _kw in _keywords:
+            _AUTOMATON.add_word(_kw, _group)
+    _AUTOMATON.make_automaton()
+except ImportError:
+    _AUTOMATON = None
+
+
+def is_sprite_sheet(item):
+    """Heuristic filter: does this dataset item look like a sprite sheet?
+
+    Top-level (and pickle-safe) so datasets can push it into its own
+    workers via IterableDataset.filter.
+    """
+    tags = item.get("tags")
+    if isinstance(tags, (list, tuple)):
+        # Exact-tag fast path: two hash intersections decide most items
+        # without ever joining or scanning the free text.
+        tag_set = {str(tag).lower() for tag in tags}
+        if tag_set & EXCLUDE_KW_SET:
+            return False
+        if tag_set & SPRITE_KW_SET:
+            return True
+    text = " ".join(
+        str(item.get(field, "")) for field in ("title", "description", "tags")
+    ).lower()
+    if _AUTOMATON is not None:
+        hits = {group for _, group in _AUTOMATON.iter(text)}
+        return "sprite" in hits and "excl" not in hits
+    if any(keyword in text for keyword in EXCLUDE_KEYWORDS):
+        return False
+    return any(keyword in text for keyword in SPRITE_KEYWORDS)
+
+
+class SpriteFetcher:
+    """Downloads sprite sheets and their metadata from remote datasets."""
+
+    def __init__(self, output_dir="sprites", max_workers=16, rate_per_sec=8):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+
+        # One session for all workers: keep-alive + TLS reuse across
+        # requests instead of a fresh handshake per sprite.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # Token-bucket pacing: each request takes a token, and a timer
+        # hands it back after a second, replacing the old global
+        # time.sleep(0.5) between serial downloads.
+        self._rate = threading.BoundedSemaphore(rate_per_sec)
+
+        self._count_lock = threading.Lock()
+        self.downloaded_count = 0
+
+        # Metadata writes are queued and flushed in one burst at the
+        # end of a fetch, with a single directory fsync as the barrier.
+        self._meta_lock = threading.Lock()
+        self._meta_queue = []
+
+        # Names already on disk, snapshotted in one scandir pass so
+        # resumed runs skip downloads without a stat per candidate.
+        self._existing = {e.name for e in os.scandir(self.output_dir)}
+
+    def generate_id(self, url, title):
+        """Stable short id for a sprite, derived from its url and title."""
+        return _short_hash(f"{url}|{title}".encode())
+
+    is_sprite_sheet = staticmethod(is_sprite_sheet)
+
+    def download_file(self, url, dest_path, timeout=30):
+        """Stream a single file to disk over the shared session."""
+        self._rate.acquire()
+        threading.Timer(1.0, self._rate.release).start()
+        response = self._session.get(url, timeout=timeout, stream=True)
+        response.raise_for_status()
+        # Unbuffered: copyfileobj already moves 1 MiB blocks, so the
+        # extra io buffering layer would only re-copy them.
+        with open(dest_path, "wb", buffering=0) as out_file:
+            shutil.copyfileobj(response.raw, out_file, length=1 << 20)
+            if hasattr(os, "posix_fadvise"):
+                # One-shot writes; keep them out of the page cache.
+                out_file.flush()
+                os.posix_fadvise(out_file.fileno(), 0, 0,
+                                 os.POSIX_FADV_DONTNEED)
+        return dest_path
+
+    def save_metadata(self, sprite_id, item):
+        metadata = {
+            "id": sprite_id,
+            "url": item.get("url", ""),
+            "title": item.get("title", ""),
+            "description": item.get("description", ""),
+            "tags": item.get("tags", []),
+        }
+        with self._meta_lock:
+            self._meta_queue.append(metadata)
+
+    def flush_metadata(self):
+        """Append all queued metadata to the single corpus file.
+
+        One sequential (zstd-compressed when available) append replaces
+        the old one-tiny-JSON-per-sprite layout: the repeated keys
+        compress to almost nothing and readers do one open instead of
+        thousands.
+        """
+        with self._meta_lock:
+            queue, self._meta_queue = self._meta_queue, []
+        if not queue:
+            return
+        corpus_path = self.output_dir / CORPUS_NAME
+        with _open_corpus(corpus_path, "ab") as f:
+            for metadata in queue:
+                f.write(_dumps_line(metadata))
+            # Push the batch to stable storage before fsyncing the
+            # directory — the directory fsync only makes the *entry*
+            # durable, not the appended bytes.
+            f.flush()
+            os.fsync(f.fileno())
+        dir_fd = os.open(self.output_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _fetch_one(self, item, file_info):
+        """Worker: download one sprite and, on success, its metadata."""
+        sprite_id = self.generate_id(file_info["url"], item.get("title", ""))
+        ext = get_file_extension(file_info["url"])
+        dest_path = self.output_dir / f"{sprite_id}{ext}"
+        if dest_path.name in self._existing:
+            return sprite_id
+        self.download_file(file_info["url"], dest_path)
+        self._existing.add(dest_path.name)
+        # Metadata is only written after the download succeeds, so a
+        # failed transfer never leaves an orphan JSON behind.
+        self.save_metadata(sprite_id, item)
+        return sprite_id
+
+    async def _download_async(self, session, semaphore, item, file_info):
+        """Async worker: stream one sprite to disk over the shared session."""
+        sprite_id = self.generate_id(file_info["url"], item.get("title", ""))
+        ext = get_file_extension(file_info["url"])
+        dest_path = self.output_dir / f"{sprite_id}{ext}"
+        if dest_path.name in self._existing:
+            return sprite_id
+        async with semaphore:
+            async with session.get(file_info["url"]) as response:
+                response.raise_for_status()
+                with open(dest_path, "wb") as out_file:
+                    async for chunk in response.content.iter_chunked(1 << 16):
+                        out_file.write(chunk)
+        self._existing.add(dest_path.name)
+        self.save_metadata(sprite_id, item)
+        return sprite_id
+
+    async def _fetch_async(self, dataset, target_count):
+        semaphore = asyncio.Semaphore(32)
+        connector = aiohttp.TCPConnector(limit=32)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = []
+            for item in dataset:
+                if len(tasks) >= target_count:
+                    break
+                url = item.get("url", "")
+                # str.endswith takes the whole tuple in one C call.
+                if not url or not url.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                tasks.append(asyncio.ensure_future(
+                    self._download_async(session, semaphore, item, {"url": url})))
+
+            for task in asyncio.as_completed(tasks):
+                try:
+                    sprite_id = await task
+                except Exception as exc:
+                    print(f"  download failed: {exc}")
+                    continue
+                self.downloaded_count += 1
+                print(f"  [{self.downloaded_count}] {sprite_id}")
+                if self.downloaded_count >= target_count:
+                    break
+        return self.downloaded_count
+
+    def fetch_from_huggingface_dataset(self, dataset_name, target_count=3000):
+        """Scan a streamed HF dataset and download matching sprites in parallel."""
+        from datasets import load_dataset
+
+        dataset = load_dataset(dataset_name, split="train", streaming=True)
+        # Classification runs inside datasets' own pipeline (parallel
+        # where it can be), so the download loops see a preclassified
+        # stream with no per-item Python filtering cost.
+        dataset = dataset.filter(is_sprite_sheet)
+
+        if aiohttp is not None:
+            # Async path: one event loop, no thread-per-download. With
+            # uvloop on Linux the loop polls via io_uring-backed libuv,
+            # cutting syscalls per request versus blocking sockets.
+            if sys.platform == "linux":
+                try:
+                    import uvloop
+                    uvloop.install()
+                except ImportError:
+                    pass
+            asyncio.run(self._fetch_async(dataset, target_count))
+            self.flush_metadata()
+            print(f"Downloaded {self.downloaded_count} sprite sheets "
+                  f"to {self.output_dir}/")
+            return self.downloaded_count
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for item in dataset:
+                with self._count_lock:
+                    if self.downloaded_count + len(futures) >= target_count:
+                        break
+                file_info = {"url": item.get("url", "")}
+                if (not file_info["url"]
+                        or not file_info["url"].lower().endswith(IMAGE_EXTENSIONS)):
+                    continue
+                futures.append(executor.submit(self._fetch_one, item, file_info))
+
+            for future in as_completed(futures):
+                try:
+                    sprite_id = future.result()
+                except Exception as exc:
+                    print(f"  download failed: {exc}")
+                    continue
+                with self._count_lock:
+                    self.downloaded_count += 1
+                    done = self.downloaded_count
+                print(f"  [{done}] {sprite_id}")
+                if done >= target_count:
+                    break
+
+        self.flush_metadata()
+        print(f"Downloaded {self.downloaded_count} sprite sheets "
+              f"to {self.output_dir}/")
+        return self.downloaded_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch sprite sheets for the tester")
+    parser.add_argument("--dataset", default="tommy-xq/sprite-sheets",
+                        help="Hugging Face dataset to scan")
+    parser.add_argument("--count", type=int, default=3000,
+                        help="target number of sprite sheets")
+    parser.add_argument("--output", default="sprites",
+                        help="output directory")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="parallel download workers")
+    args = parser.parse_args()
+
+    fetcher = SpriteFetcher(output_dir=args.output, max_workers=args.workers)
+    fetcher.fetch_from_huggingface_dataset(args.dataset, target_count=args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Tiny dev server for the tester page.
+
+Serves the repo root (index.html plus any fetched sprites) so the
+tester can load local files without file:// CORS headaches.
+"""
+
+import os
+import sys
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Everything the tester actually serves; one dict hit per request
+# instead of the mimetypes-module lookup (and its import lock).
+_MIME = {
+    ".html": "text/html",
+    ".htm": "text/html",
+    ".js": "application/javascript",
+    ".mjs": "application/javascript",
+    ".css": "text/css",
+    ".json": "application/json",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".ico": "image/x-icon",
+    ".svg": "image/svg+xml",
+}
+
+
+class MyHTTPRequestHandler(SimpleHTTPRequestHandler):
+
+    def guess_type(self, path):
+        return _MIME.get(path[path.rfind("."):].lower(),
+                         "application/octet-stream")
+
+    def copyfile(self, source, outputfile):
+        """Send regular files with os.sendfile instead of a read/write loop.
+
+        The kernel moves pages straight from the page cache to the
+        socket, skipping the userspace copy the base class does.
+        """
+        if hasattr(os, "sendfile"):
+            try:
+                in_fd = source.fileno()
+            except (AttributeError, OSError):
+                in_fd = None
+            if in_fd is not None:
+                self.wfile.flush()
+                out_fd = self.connection.fileno()
+                size = os.fstat(in_fd).st_size
+                offset = 0
+                try:
+                    while offset < size:
+                        sent = os.sendfile(out_fd, in_fd, offset,
+                                           size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except OSError:
+                    if offset:
+                        raise
+                    # sendfile unsupported here; fall through below.
+        super().copyfile(source, outputfile)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    with ThreadingHTTPServer(("", port), MyHTTPRequestHandler) as httpd:
+        print(f"Serving on http://localhost:{port}")
+        httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
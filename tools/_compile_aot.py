@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Ahead-of-time compile the detect_grid kernels.
+
+Run from the repo root:
+
+    python3 tools/_compile_aot.py
+
+This writes a `_detect_kernels` shared library next to detect_grid.py.
+detect_grid imports it when present, skipping numba's per-process JIT
+warmup (a few hundred ms that dominates CLI runs on small images); when
+the library is absent it falls back to the JIT'd or pure-NumPy paths.
+
+The function bodies mirror the @njit kernels in detect_grid.py and
+detect_direction.py — numba's AOT compiler needs plain functions with
+concrete signatures, so they cannot share the decorated dispatchers
+directly. Keep them in sync when the kernels change. (pycc supports
+neither prange nor tuple returns, so analyze_rows_kernel is the serial
+variant and stacks its three metrics into one array.)
+"""
+
+import numpy as np
+from numba.pycc import CC
+
+cc = CC("_detect_kernels")
+cc.output_dir = "."
+
+
+@cc.export("find_peaks_kernel", "intp[:](f4[:], f4, i8)")
+def find_peaks_kernel(signal, threshold, min_distance):
+    n = signal.shape[0]
+    cand = np.empty(n, np.intp)
+    m = 0
+    for i in range(1, n - 1):
+        s = signal[i]
+        if s > threshold and s > signal[i - 1] and s > signal[i + 1]:
+            cand[m] = i
+            m += 1
+    strengths = np.empty(m, np.float32)
+    for j in range(m):
+        strengths[j] = -signal[cand[j]]
+    order = np.argsort(strengths)
+    suppressed = np.zeros(n, np.bool_)
+    peaks = np.empty(m, np.intp)
+    k = 0
+    for j in range(m):
+        p = cand[order[j]]
+        if suppressed[p]:
+            continue
+        peaks[k] = p
+        k += 1
+        lo = p - min_distance
+        if lo < 0:
+            lo = 0
+        hi = p + min_distance + 1
+        if hi > n:
+            hi = n
+        for q in range(lo, hi):
+            suppressed[q] = True
+    return np.sort(peaks[:k])
+
+
+@cc.export("best_period_kernel", "f8[:](f4[:], i8, i8)")
+def best_period_kernel(centered, min_size, hi):
+    n = centered.shape[0]
+    best_period = 0
+    best_score = 0.0
+    for period in range(min_size, hi):
+        acc = 0.0
+        for i in range(n - period):
+            acc += centered[i] * centered[i + period]
+        acc /= n - period
+        if acc > best_score:
+            best_score = acc
+            best_period = period
+    out = np.empty(2, np.float64)
+    out[0] = best_period
+    out[1] = best_score
+    return out
+
+
+@cc.export("analyze_rows_kernel", "f4[:, :](f4[:, :], i8, i8, i8, i8)")
+def analyze_rows_kernel(gray, num_rows, cols, fh, fw):
+    out = np.zeros((3, num_rows), np.float32)
+    for r in range(num_rows):
+        centers = np.empty(cols, np.float32)
+        for f in range(cols):
+            total = 0.0
+            weighted = 0.0
+            for y in range(fh):
+                row_sum = 0.0
+                for x in range(fw):
+                    row_sum += gray[r * fh + y, f * fw + x]
+                total += row_sum
+                weighted += y * row_sum
+            centers[f] = weighted / total if total > 0 else 0.0
+        mean_c = centers.mean()
+        var = 0.0
+        for f in range(cols):
+            var += (centers[f] - mean_c) ** 2
+        out[0, r] = var / cols
+
+        half = fw // 2
+        lean = 0.0
+        for f in range(cols):
+            left = 0.0
+            right = 0.0
+            for y in range(fh):
+                for x in range(half):
+                    left += gray[r * fh + y, f * fw + x]
+                for x in range(fw - half, fw):
+                    right += gray[r * fh + y, f * fw + x]
+            denom = left + right
+            if denom > 1e-12:
+                lean += (right - left) / denom
+        out[1, r] = lean / cols
+
+        if cols >= 2:
+            total_motion = 0.0
+            for f in range(cols - 1):
+                acc = 0.0
+                for y in range(fh):
+                    for x in range(fw):
+                        d = (gray[r * fh + y, f * fw + x]
+                             - gray[r * fh + y, (f + 1) * fw + x])
+                        acc += abs(d)
+                total_motion += acc / (fh * fw)
+            out[2, r] = total_motion / (cols - 1)
+    return out
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print("Built _detect_kernels")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Pick out animated character sheets from the fetched sprite corpus.
+
+Reads the ``metadata.jsonl(.zst)`` corpus written by fetch_sprites.py
+(falling back to legacy per-sprite JSON files), keeps
+the sheets that look like animated characters, buckets them by
+character type and declared sprite size, and writes the survivors to
+``animated_characters.json``.
+"""
+
+import io
+import json
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import zstandard
+
+    def _open_corpus(path, mode):
+        # ZstdDecompressionReader supports neither readline nor
+        # iteration; BufferedReader layers both over the raw stream.
+        stream = zstandard.open(path, mode)
+        if "r" in mode:
+            return io.BufferedReader(stream)
+        return stream
+except ImportError:
+    zstandard = None
+
+    def _open_corpus(path, mode):
+        return open(path, mode)
+
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj):
+        return json.dumps(obj, indent=2).encode()
+
+ANIMATION_KEYWORDS = [
+    "animated", "animation", "walk cycle", "run cycle", "idle",
+    "walking", "running", "jumping", "attack animation", "frames",
+    "walk", "movement",
+]
+
+CHARACTER_KEYWORDS = [
+    "character", "player", "hero", "npc", "enemy", "monster",
+    "creature", "humanoid", "person", "knight", "wizard", "warrior",
+    "villager", "animal",
+]
+
+EXCLUSION_KEYWORDS = [
+    "tileset", "tile set", "background", "terrain", "ui", "button",
+    "icon pack", "font", "logo",
+]
+
+PLAYER_KEYWORDS = ["player", "hero", "protagonist", "main character"]
+ENEMY_KEYWORDS = ["enemy", "monster", "boss", "zombie", "skeleton", "slime"]
+NPC_KEYWORDS = ["npc", "villager", "shopkeeper", "merchant", "townsfolk"]
+ANIMAL_KEYWORDS = ["animal", "cat", "dog", "bird", "horse", "wolf", "dragon"]
+
+# Frozen copies for O(1) whole-tag membership on the fast path.
+ANIM_KW_SET = frozenset(ANIMATION_KEYWORDS)
+CHAR_KW_SET = frozenset(CHARACTER_KEYWORDS)
+EXCL_KW_SET = frozenset(EXCLUSION_KEYWORDS)
+
+# Declared frame dimensions like "32x32" or "16x18" in free text.
+SIZE_RE = re.compile(r"\b(\d{1,3})x(\d{1,3})\b")
+
+# One compiled alternation per keyword group: a single C-level scan of
+# the text instead of one Python-level `in` per keyword.
+ANIM_RE, CHAR_RE, EXCL_RE, PLAYER_RE, ENEMY_RE, NPC_RE, ANIMAL_RE = [
+    re.compile("|".join(map(re.escape, keywords)))
+    for keywords in (ANIMATION_KEYWORDS, CHARACTER_KEYWORDS,
+                     EXCLUSION_KEYWORDS, PLAYER_KEYWORDS, ENEMY_KEYWORDS,
+                     NPC_KEYWORDS, ANIMAL_KEYWORDS)
+]
+
+
+def _build_automaton():
+    """One pass per text instead of one scan per keyword."""
+    automaton = ahocorasick.Automaton()
+    for group, keywords in (("anim", ANIMATION_KEYWORDS),
+                            ("char", CHARACTER_KEYWORDS),
+                            ("excl", EXCLUSION_KEYWORDS)):
+        for keyword in keywords:
+            automaton.add_word(keyword, group)
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+
+
+def _search_blob(sprite):
+    """Lowercased tags+title+description, built once and cached on the dict."""
+    blob = sprite.get("_blob")
+    if blob is None:
+        blob = sprite["_blob"] = " ".join(
+            [tag.lower() for tag in sprite.get("tags", [])]
+            + [sprite.get("title", "").lower(),
+               sprite.get("description", "").lower()])
+    return blob
+
+
+def is_animated_character_sheet(sprite):
+    """Does this sprite's metadata describe an animated character sheet?"""
+    tags = sprite.get("tags")
+    if isinstance(tags, (list, tuple)):
+        # Exact-tag fast path: hash intersections decide well-tagged
+        # sprites without building or scanning the text blob.
+        tag_set = {str(tag).lower() for tag in tags}
+        if tag_set & EXCL_KW_SET:
+            return False
+        if tag_set & ANIM_KW_SET and tag_set & CHAR_KW_SET:
+            return True
+    all_text = _search_blob(sprite)
+
+    if _AUTOMATON is not None:
+        hits = {group for _, group in _AUTOMATON.iter(all_text)}
+        return "anim" in hits and "char" in hits and "excl" not in hits
+
+    # Short-circuits on the (common) ANIM_RE miss before running the
+    # other two engines.
+    return bool(ANIM_RE.search(all_text) and CHAR_RE.search(all_text)
+                and not EXCL_RE.search(all_text))
+
+
+def categorize_character_type(sprite):
+    """Rough character-type bucket for a sheet that passed the filter."""
+    all_text = _search_blob(sprite)
+
+    if PLAYER_RE.search(all_text):
+        return "player"
+    if ENEMY_RE.search(all_text):
+        return "enemy"
+    if NPC_RE.search(all_text):
+        return "npc"
+    if ANIMAL_RE.search(all_text):
+        return "animal"
+    return "other"
+
+
+def extract_sizes(sprite):
+    """Declared frame sizes (e.g. 32x32) mentioned in the metadata."""
+    all_text = " ".join([sprite.get("title", ""),
+                         sprite.get("description", "")]).lower()
+    return [f"{w}x{h}" for w, h in SIZE_RE.findall(all_text)]
+
+
+def _iter_sprites(directory="sprites"):
+    """Yield decoded metadata dicts from the corpus.
+
+    Prefers the single jsonl(.zst) corpus file the fetcher now appends
+    to — one sequential read instead of thousands of opens — and falls
+    back to scanning legacy per-sprite JSON files with os.scandir.
+    """
+    for name in ("metadata.jsonl.zst", "metadata.jsonl"):
+        corpus_path = os.path.join(directory, name)
+        if os.path.exists(corpus_path):
+            if name.endswith(".zst") and zstandard is None:
+                continue
+            with _open_corpus(corpus_path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield _loads(line)
+            return
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (entry.name.endswith(".json")
+                    and entry.is_file(follow_symlinks=False)):
+                with open(entry.path, "rb") as f:
+                    yield _loads(f.read())
+
+
+def main():
+    print("Scanning sprites/ for metadata...")
+
+    # Stream decode -> filter -> categorize in one pass; the full corpus
+    # is never materialized, only the survivors.
+    animated_chars = []
+    scanned = 0
+    for sprite in _iter_sprites():
+        scanned += 1
+        if not is_animated_character_sheet(sprite):
+            continue
+        # The cached blob from the filter is reused here, then dropped
+        # so it never lands in the output JSON.
+        sprite["char_type"] = categorize_character_type(sprite)
+        del sprite["_blob"]
+        animated_chars.append(sprite)
+
+    # Plain dicts: both groupings have a handful of distinct keys, so
+    # Counter's generic machinery costs more than it saves.
+    type_counts = defaultdict(int)
+    size_counts = defaultdict(int)
+    for sprite in animated_chars:
+        type_counts[sprite["char_type"]] += 1
+        for size in extract_sizes(sprite):
+            size_counts[size] += 1
+
+    print(f"Found {len(animated_chars)} animated character sheets "
+          f"in {scanned} metadata files")
+    for char_type, count in sorted(type_counts.items(), key=lambda kv: -kv[1]):
+        print(f"  {char_type}: {count}")
+    if size_counts:
+        print("Declared sizes:")
+        for size, count in sorted(size_counts.items(), key=lambda kv: -kv[1]):
+            print(f"  {size}: {count}")
+
+    out_path = Path("animated_characters.json")
+    out_path.write_bytes(_dumps(animated_chars))
+    print(f"Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""Distill Claude's sprite-direction labels into a small local model.
+
+Three stages, one subcommand each: ``collect`` asks Claude to label
+the facing direction of every row in the layout-confident sheets,
+``train`` fits a MobileNetV3-Small head on those labels, and ``test``
+runs the trained model on a single sheet. The collected labels go to
+``training_data.json``; the checkpoint to ``sprite_direction_model.pt``.
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import os
+import hashlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+except ImportError:
+    def _loads(data):
+        return json.loads(data)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from detect_direction import DIRECTIONS  # noqa: E402
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+MODEL_NAME = "claude-sonnet-4-20250514"
+
+# Bump when the prompt wording changes so cached labels from the old
+# prompt are not reused.
+PROMPT_VERSION = 1
+
+PROMPT = (
+    "Each image is one row of a character sprite sheet walk cycle. "
+    "For every row, decide which direction the character is facing. "
+    "Reply with JSON only: "
+    '{"rows": [{"row": 0, "direction": "down|up|left|right", '
+    '"confidence": 0.0}]}'
+)
+
+# Claude's answers are fully determined by the image bytes, the frame
+# geometry, the prompt and the model — memoize them on disk so
+# re-running collection during dataset curation costs nothing for
+# sheets already labelled.
+CACHE_DIR = Path(".cache/claude_labels")
+
+
+def _cache_key(row_buffers, frame_width, frame_height, rows):
+    hasher = hashlib.sha256()
+    for buffer in row_buffers:
+        hasher.update(buffer)
+    hasher.update(repr((frame_width, frame_height, rows,
+                        MODEL_NAME, PROMPT_VERSION)).encode())
+    return hasher.hexdigest()
+
+
+def _cache_get(key):
+    path = CACHE_DIR / f"{key}.json"
+    if path.exists():
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    return None
+
+
+def _cache_put(key, labels, raw_text):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Raw response text rides along for debugging bad parses.
+    payload = {"labels": labels, "raw": raw_text}
+    with open(CACHE_DIR / f"{key}.json", "w") as f:
+        json.dump(payload, f)
+
+
+def _extract_json(text):
+    """First balanced ``{...}`` block in the reply, parsed.
+
+    A linear brace scan replaces the old greedy ``\\{.*\\}`` regex,
+    which backtracked badly and grabbed from the first ``{`` to the
+    last ``}`` even across unrelated fragments. Braces inside string
+    values are not tracked — Claude's JSON replies do not nest them.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    for i in range(start, len(text)):
+        char = text[i]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                try:
+                    return _loads(text[start:i + 1])
+                except ValueError:
+                    return None
+    return None
+
+
+@functools.lru_cache(maxsize=128)
+def _load_sheet(path):
+    """Decoded sheet as an RGB array, cached across rows and epochs."""
+    return np.asarray(Image.open(path).convert("RGB"))
+
+
+def extract_sprite_frames(image_path, frame_height, rows=4):
+    """One ndarray view per row of the sheet — no crops, no copies.
+
+    The sheet is decoded once and every row is a zero-copy slice;
+    callers that need a PIL image wrap with Image.fromarray at the
+    boundary where PIL is actually required.
+    """
+    sheet = _load_sheet(str(image_path))
+    return [sheet[row * frame_height:(row + 1) * frame_height]
+            for row in range(rows)]
+
+
+async def ask_claude_to_label_sprite(client, image_path, frame_width,
+                                     frame_height, rows=4):
+    """Direction labels for each row of one sheet, cached on disk."""
+    row_images = extract_sprite_frames(image_path, frame_height, rows)
+    row_buffers = []
+    for row in row_images:
+        buffer = io.BytesIO()
+        # Pixel art survives an adaptive 32-color palette untouched,
+        # and the paletted PNG is a fraction of the truecolor bytes —
+        # smaller upload, smaller base64 inflation. zlib level 1: for
+        # these tiny paletted rows deeper compression costs real CPU
+        # for a few hundred saved bytes.
+        Image.fromarray(row).convert(
+            "P", palette=Image.ADAPTIVE, colors=32).save(
+            buffer, format="PNG", compress_level=1, optimize=False)
+        row_buffers.append(buffer.getvalue())
+
+    key = _cache_key(row_buffers, frame_width, frame_height, rows)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached["labels"]
+
+    content = []
+    for i, data in enumerate(row_buffers):
+        content.append({"type": "text", "text": f"Row {i}:"})
+        content.append({
+            "type": "image",
+            "source": {"type": "base64", "media_type": "image/png",
+                       "data": base64.b64encode(data).decode()},
+        })
+    content.append({"type": "text", "text": PROMPT})
+
+    response = await client.messages.create(
+        model=MODEL_NAME,
+        max_tokens=1024,
+        messages=[{"role": "user", "content": content}],
+    )
+    response_text = response.content[0].text
+
+    labels = _extract_json(response_text)
+    if labels is None:
+        return None
+
+    _cache_put(key, labels, response_text)
+    return labels
+
+
+async def _collect_async(layouts):
+    """Label all sheets concurrently; API latency overlaps."""
+    client = anthropic.AsyncAnthropic()
+    # Concurrency cap for rate-limit politeness; within it, every
+    # in-flight request hides the others' round trips.
+    semaphore = asyncio.Semaphore(16)
+
+    async def label_one(layout):
+        best = layout["best_layout"]
+        async with semaphore:
+            labels = await ask_claude_to_label_sprite(
+                client, layout["file"], best["sprite_w"],
+                best["sprite_h"], rows=min(best["rows"], 4))
+        return layout, labels
+
+    return await asyncio.gather(*(label_one(l) for l in layouts),
+                                return_exceptions=True)
+
+
+def collect_training_data(layouts_file="sprite_layouts.json",
+                          output_file="training_data.json", limit=None):
+    """Label every layout-confident sheet and write the training set."""
+    if anthropic is None:
+        print("collect requires the anthropic package")
+        return
+
+    with open(layouts_file) as f:
+        layouts = json.load(f)
+    layouts = [l for l in layouts
+               if l.get("confidence") != "low" and l.get("best_layout")]
+    if limit:
+        layouts = layouts[:limit]
+
+    results = asyncio.run(_collect_async(layouts))
+
+    training_data = []
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"  failed: {result}")
+            continue
+        layout, labels = result
+        if not labels or "rows" not in labels:
+            continue
+        best = layout["best_layout"]
+        for entry in labels["rows"]:
+            if entry.get("direction") in DIRECTIONS:
+                training_data.append({
+                    "file": layout["file"],
+                    "frame_height": best["sprite_h"],
+                    "row": entry["row"],
+                    "direction": entry["direction"],
+                })
+        print(f"  {layout['file']}: {len(labels['rows'])} rows")
+
+    with open(output_file, "w") as f:
+        json.dump(training_data, f, indent=2)
+    print(f"Wrote {len(training_data)} labelled rows to {output_file}")
+
+
+def train_small_model(data_file="training_data.json",
+                      model_file="sprite_direction_model.pt",
+                      epochs=20, batch_size=32):
+    """Fit a MobileNetV3-Small direction head on the Claude labels."""
+    import torch
+    from torch import nn
+    from torch.utils.data import DataLoader, Dataset, TensorDataset
+    from torchvision import models, transforms
+
+    class SpriteDataset(Dataset):
+        """Every row crop decoded and transformed exactly once.
+
+        The whole set fits easily in memory (64x64 float32 rows), so
+        __init__ materializes one resident tensor and __getitem__ is
+        a plain index — no per-epoch file opens or transforms.
+        """
+
+        def __init__(self, data, transform):
+            crops, labels = [], []
+            for entry in data:
+                # lru-cached decode + zero-copy row slice; PIL only
+                # comes back at the transform boundary.
+                sheet = _load_sheet(entry["file"])
+                fh = entry["frame_height"]
+                row_img = Image.fromarray(
+                    sheet[entry["row"] * fh:(entry["row"] + 1) * fh])
+                crops.append(transform(row_img))
+                labels.append(DIRECTIONS.index(entry["direction"]))
+            self.X = (torch.stack(crops) if crops
+                      else torch.empty(0, 3, 64, 64))
+            self.y = torch.tensor(labels, dtype=torch.long)
+
+        def __len__(self):
+            return len(self.y)
+
+        def __getitem__(self, idx):
+            return self.X[idx], self.y[idx]
+
+    with open(data_file) as f:
+        data = json.load(f)
+
+    transform = transforms.Compose([
+        transforms.Resize((64, 64)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    ])
+    use_cuda = torch.cuda.is_available()
+    device = torch.device("cuda" if use_cuda else "cpu")
+    # The dataset is memory-resident, so worker processes would only
+    # duplicate it; a plain in-process loader is fastest.
+    loader = DataLoader(SpriteDataset(data, transform),
+                        batch_size=batch_size,
+                        pin_memory=use_cuda)
+
+    if use_cuda:
+        # Input shape is fixed at 64x64, so letting cudnn benchmark
+        # its kernels once pays off for the whole run.
+        torch.backends.cudnn.benchmark = True
+
+    model = models.mobilenet_v3_small(
+        weights=models.MobileNet_V3_Small_Weights.DEFAULT)
+    model.classifier[3] = nn.Linear(model.classifier[3].in_features,
+                                    len(DIRECTIONS))
+    model = model.to(device)
+
+    # Only the classifier head actually learns here, so the frozen
+    # backbone runs exactly once: one inference pass turns every row
+    # crop into its pooled feature vector, and the epochs loop over
+    # those cached vectors instead of re-running the convolutions.
+    # The cache lands next to the training data and is reused while
+    # it is newer than the label file.
+    for param in model.features.parameters():
+        param.requires_grad = False
+
+    features_file = Path(data_file).with_suffix(".features.npz")
+    if (features_file.exists()
+            and features_file.stat().st_mtime
+            >= os.path.getmtime(data_file)):
+        cached = np.load(features_file)
+        feats = torch.from_numpy(cached["features"])
+        targets = torch.from_numpy(cached["labels"])
+    else:
+        model.eval()
+        feat_chunks, label_chunks = [], []
+        with torch.inference_mode():
+            for inputs, labels in loader:
+                inputs = inputs.to(device, non_blocking=True)
+                # bf16 autocast on GPU: half the activation bandwidth
+                # on the convolutions.
+                with torch.autocast("cuda", dtype=torch.bfloat16,
+                                    enabled=use_cuda):
+                    pooled = model.avgpool(
+                        model.features(inputs)).flatten(1)
+                feat_chunks.append(pooled.float().cpu())
+                label_chunks.append(labels)
+        feats = torch.cat(feat_chunks)
+        targets = torch.cat(label_chunks)
+        np.savez(features_file, features=feats.numpy(),
+                 labels=targets.numpy())
+
+    head_loader = DataLoader(TensorDataset(feats, targets),
+                             batch_size=batch_size, shuffle=True,
+                             pin_memory=use_cuda)
+
+    criterion = nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(model.classifier.parameters(), lr=1e-3)
+
+    model.classifier.train()
+    for epoch in range(epochs):
+        total_loss = 0.0
+        correct = total = 0
+        for inputs, labels in head_loader:
+            inputs = inputs.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
+            optimizer.zero_grad()
+            outputs = model.classifier(inputs)
+            loss = criterion(outputs, labels)
+            loss.backward()
+            optimizer.step()
+            total_loss += float(loss)
+            correct += int((outputs.argmax(1) == labels).sum())
+            total += len(labels)
+        print(f"  epoch {epoch + 1}/{epochs}: "
+              f"loss {total_loss / max(len(head_loader), 1):.4f}, "
+              f"acc {100.0 * correct / max(total, 1):.1f}%")
+
+    torch.save({"model_state_dict": model.state_dict(),
+                "directions": list(DIRECTIONS)}, model_file)
+    print(f"Saved {model_file}")
+
+
+def test_model(image_path, frame_height=18,
+               model_file="sprite_direction_model.pt", rows=4):
+    """Run the trained model on one sheet and print row directions."""
+    import torch
+    from torch import nn
+    from torchvision import models, transforms
+
+    checkpoint = torch.load(model_file, map_location="cpu")
+
+    def build():
+        net = models.mobilenet_v3_small(weights=None)
+        net.classifier[3] = nn.Linear(net.classifier[3].in_features,
+                                      len(DIRECTIONS))
+        return net
+
+    try:
+        # Meta-device construction skips allocating and initializing
+        # weights that load_state_dict would immediately overwrite;
+        # assign=True materializes the checkpoint tensors directly.
+        with torch.device("meta"):
+            model = build()
+        model.load_state_dict(checkpoint["model_state_dict"],
+                              assign=True)
+    except (TypeError, RuntimeError, NotImplementedError):
+        # Older torch without meta-device factory or assign support.
+        model = build()
+        model.load_state_dict(checkpoint["model_state_dict"])
+    model.eval()
+    try:
+        # Same treatment as the CLIP path in detect_direction:
+        # dynamic int8 on the Linear layers for the CPU inference
+        # path. The FP32 master stays in the checkpoint untouched.
+        model = torch.quantization.quantize_dynamic(
+            model, {nn.Linear}, dtype=torch.qint8)
+    except Exception:
+        pass
+
+    transform = transforms.Compose([
+        transforms.Resize((64, 64)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    ])
+
+    # All rows through the model as one batch: one kernel selection
+    # and one dispatch instead of a launch per row.
+    row_images = extract_sprite_frames(image_path, frame_height, rows)
+    batch = torch.stack([transform(Image.fromarray(view))
+                         for view in row_images])
+    with torch.inference_mode():
+        logits = model(batch)
+    probs = torch.softmax(logits, dim=1)
+    preds = probs.argmax(dim=1)
+    for row in range(len(row_images)):
+        best = int(preds[row])
+        print(f"  row {row}: {DIRECTIONS[best]} "
+              f"({100.0 * float(probs[row, best]):.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Distill Claude direction labels into a local model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_collect = sub.add_parser("collect", help="label sheets via Claude")
+    p_collect.add_argument("--layouts", default="sprite_layouts.json")
+    p_collect.add_argument("--output", default="training_data.json")
+    p_collect.add_argument("--limit", type=int)
+
+    p_train = sub.add_parser("train", help="train the direction model")
+    p_train.add_argument("--data", default="training_data.json")
+    p_train.add_argument("--model", default="sprite_direction_model.pt")
+    p_train.add_argument("--epochs", type=int, default=20)
+    p_train.add_argument("--batch-size", type=int, default=32)
+
+    p_test = sub.add_parser("test", help="run the model on one sheet")
+    p_test.add_argument("image")
+    p_test.add_argument("--frame-height", type=int, default=18)
+    p_test.add_argument("--model", default="sprite_direction_model.pt")
+
+    args = parser.parse_args()
+    if args.command == "collect":
+        collect_training_data(args.layouts, args.output, args.limit)
+    elif args.command == "train":
+        train_small_model(args.data, args.model, args.epochs,
+                          args.batch_size)
+    elif args.command == "test":
+        test_model(args.image, args.frame_height, args.model)
+
+
+if __name__ == "__main__":
+    main()